@@ -1,7 +1,9 @@
 import streamlit as st
 from langchain_ollama import ChatOllama
 from langchain.agents import create_agent
-from langgraph.checkpoint.memory import InMemorySaver
+from budget import BudgetMiddleware, QuestionBudget
+from checkpointer import get_checkpointer
+from context_window import ContextWindowMiddleware, OLLAMA_NUM_CTX
 from tools import *
 import os
 from uuid import uuid4
@@ -9,6 +11,16 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+@st.cache_resource
+def shared_checkpointer():
+    # Uma única conexão/pool para todas as sessões do Streamlit
+    return get_checkpointer()
+
+@st.cache_resource
+def shared_context_window():
+    # O num_ctx carregado no Ollama é o mesmo para todas as sessões
+    return ContextWindowMiddleware()
+
 st.title("Agent Chat")
 
 # Initialize session state
@@ -19,7 +31,7 @@ if "agent" not in st.session_state:
     llm = ChatOllama(
         model=os.getenv('OLLAMA_MODEL'),
         reasoning=os.getenv('OLLAMA_REASONING'),
-        num_ctx=int(os.getenv('OLLAMA_NUM_CTX')),
+        num_ctx=OLLAMA_NUM_CTX,
         base_url=os.getenv('OLLAMA_BASE_URL')
     )
  
@@ -40,9 +52,12 @@ if "agent" not in st.session_state:
             github_search,
             visit_url,
             get_repository_issue_info,
+            find_similar_items,
         ],
-        checkpointer=InMemorySaver(),
-        system_prompt=prompt
+        checkpointer=shared_checkpointer(),
+        system_prompt=prompt,
+        middleware=[BudgetMiddleware(), shared_context_window()],
+        context_schema=QuestionBudget,
     )
     
     st.session_state.config = {
@@ -81,6 +96,9 @@ if prompt := st.chat_input("Enter your question..."):
         reasoning_text = ""
         final_content = ""
         tool_call_count = 0
+        num_ctx = None
+        # Limites de tempo, turnos, ferramentas e tokens valem para cada pergunta
+        budget = QuestionBudget()
         
         response_container = st.empty()
         
@@ -89,6 +107,7 @@ if prompt := st.chat_input("Enter your question..."):
             {"messages": [{"role": "user", "content": prompt}]},
             st.session_state.config,
             stream_mode="values",
+            context=budget,
         ):
             last_msg = step["messages"][-1]
             last_msg_additional_kwargs = last_msg.additional_kwargs if hasattr(last_msg, "additional_kwargs") else {}
@@ -106,6 +125,7 @@ if prompt := st.chat_input("Enter your question..."):
             # Get final content
             if role == "ai" and hasattr(last_msg, "content"):
                 final_content = last_msg.content
+                num_ctx = last_msg.response_metadata.get("num_ctx", num_ctx)
                 response_container.write(final_content)
         
         # Show reasoning
@@ -121,7 +141,9 @@ if prompt := st.chat_input("Enter your question..."):
                     st.write(f"{i}. {reasoning_text} -> {tool_name}({args})")
         
         # Show summary
-        summary = f"Total tool calls: {tool_call_count}"
+        summary = f"Total tool calls: {tool_call_count} | num_ctx: {num_ctx}"
+        if budget.exceeded:
+            summary += f" | Budget exceeded: {budget.exceeded}"
         st.info(summary)
         
         # Save to session state
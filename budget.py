@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+import time
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import HumanMessage, ToolMessage
+from logger import logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BUDGET_MAX_SECONDS = float(os.getenv('BUDGET_MAX_SECONDS', '300'))
+BUDGET_MAX_LLM_TURNS = int(os.getenv('BUDGET_MAX_LLM_TURNS', '20'))
+BUDGET_MAX_TOOL_CALLS = int(os.getenv('BUDGET_MAX_TOOL_CALLS', '15'))
+BUDGET_MAX_TOKENS = int(os.getenv('BUDGET_MAX_TOKENS', '200000'))
+
+FINAL_ANSWER_PROMPT = (
+    "O limite de recursos para esta pergunta foi atingido. "
+    "Não chame mais ferramentas: responda agora com as informações que você já tem, "
+    "deixando claro o que não foi possível verificar."
+)
+
+
+class QuestionBudget:
+    """Contadores e cache de ferramentas de uma única pergunta.
+
+    Uma instância nova é passada como ``context`` em cada execução do agente, então
+    perguntas simultâneas nunca compartilham contadores nem resultados de ferramentas.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.llm_turns = 0
+        self.tool_calls = 0
+        self.tokens = 0
+        self.cache_hits = 0
+        self.exceeded = None
+        self.tool_cache = {}
+        # Chamadas de ferramenta da mesma mensagem rodam em paralelo
+        self.lock = threading.Lock()
+
+    def check(self):
+        if self.exceeded is None:
+            if time.monotonic() - self.started_at >= BUDGET_MAX_SECONDS:
+                self.exceeded = "wall_time"
+            elif self.llm_turns >= BUDGET_MAX_LLM_TURNS:
+                self.exceeded = "llm_turns"
+            elif self.tool_calls >= BUDGET_MAX_TOOL_CALLS:
+                self.exceeded = "tool_calls"
+            elif self.tokens >= BUDGET_MAX_TOKENS:
+                self.exceeded = "tokens"
+            if self.exceeded is not None:
+                logger.info(f"Limite de {self.exceeded} atingido", extra={"role": "budget", "tool_name": None})
+        return self.exceeded
+
+    def usage(self):
+        return {
+            "wall_time": {"used": round(time.monotonic() - self.started_at, 3), "limit": BUDGET_MAX_SECONDS},
+            "llm_turns": {"used": self.llm_turns, "limit": BUDGET_MAX_LLM_TURNS},
+            "tool_calls": {"used": self.tool_calls, "limit": BUDGET_MAX_TOOL_CALLS},
+            "tokens": {"used": self.tokens, "limit": BUDGET_MAX_TOKENS},
+            "cached_tool_calls": self.cache_hits,
+            "exceeded": self.exceeded,
+        }
+
+
+class BudgetMiddleware(AgentMiddleware):
+    """Limita tempo, turnos do LLM, chamadas de ferramentas e tokens por pergunta.
+
+    O estado fica no QuestionBudget recebido como contexto da execução; sem ele, nada é limitado.
+    Chamadas de ferramenta repetidas com os mesmos argumentos dentro da mesma pergunta
+    devolvem o resultado anterior sem executar a ferramenta de novo.
+    """
+
+    def wrap_model_call(self, request, handler):
+        budget = request.runtime.context
+        if not isinstance(budget, QuestionBudget):
+            return handler(request)
+        if budget.check():
+            # Última chamada sem ferramentas para forçar uma resposta final
+            request.tools = []
+            request.messages = [*request.messages, HumanMessage(content=FINAL_ANSWER_PROMPT)]
+        budget.llm_turns += 1
+        return handler(request)
+
+    def after_model(self, state, runtime):
+        budget = runtime.context
+        if isinstance(budget, QuestionBudget):
+            usage_metadata = getattr(state["messages"][-1], "usage_metadata", None) or {}
+            budget.tokens += usage_metadata.get("total_tokens", 0)
+        return None
+
+    def wrap_tool_call(self, request, handler):
+        budget = request.runtime.context
+        if not isinstance(budget, QuestionBudget):
+            return handler(request)
+
+        tool_call = request.tool_call
+        key = (tool_call["name"], json.dumps(tool_call.get("args", {}), sort_keys=True, default=str))
+        with budget.lock:
+            cached = budget.tool_cache.get(key)
+            if cached is not None:
+                budget.cache_hits += 1
+            exceeded = cached is None and budget.check()
+            if cached is None and not exceeded:
+                budget.tool_calls += 1
+
+        if cached is not None:
+            logger.info(f"Reaproveitando resultado de {tool_call['name']}", extra={"role": "budget", "tool_name": tool_call["name"]})
+            return ToolMessage(content=cached, tool_call_id=tool_call["id"], name=tool_call["name"])
+        if exceeded:
+            return ToolMessage(content=FINAL_ANSWER_PROMPT, tool_call_id=tool_call["id"], name=tool_call["name"])
+
+        result = handler(request)
+        if isinstance(result, ToolMessage) and result.status != "error":
+            with budget.lock:
+                budget.tool_cache[key] = result.content
+        return result
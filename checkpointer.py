@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import zlib
+from pathlib import Path
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from logger import logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = Path(__file__).resolve().parent
+# memory (um único processo), sqlite (um nó) ou postgres (vários nós)
+CHECKPOINTER = os.getenv('CHECKPOINTER', 'memory')
+CHECKPOINTER_URL = os.getenv('CHECKPOINTER_URL', str(BASE_DIR / "checkpoints.sqlite"))
+# Quantidade de checkpoints mantidos por conversa
+CHECKPOINTER_KEEP = int(os.getenv('CHECKPOINTER_KEEP', '20'))
+# Payloads maiores que isso são comprimidos com zlib
+CHECKPOINTER_COMPRESS_MIN_BYTES = int(os.getenv('CHECKPOINTER_COMPRESS_MIN_BYTES', '1024'))
+
+_ZLIB_SUFFIX = "+zlib"
+
+
+class CompressedSerializer(JsonPlusSerializer):
+    """msgpack serializer that compresses large payloads with zlib."""
+
+    def dumps_typed(self, obj):
+        type_, data = super().dumps_typed(obj)
+        if len(data) >= CHECKPOINTER_COMPRESS_MIN_BYTES:
+            return type_ + _ZLIB_SUFFIX, zlib.compress(data)
+        return type_, data
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_.endswith(_ZLIB_SUFFIX):
+            return super().loads_typed((type_[:-len(_ZLIB_SUFFIX)], zlib.decompress(payload)))
+        return super().loads_typed(data)
+
+
+def get_checkpointer(kind: str = CHECKPOINTER, url: str = CHECKPOINTER_URL):
+    """Create the checkpointer selected by CHECKPOINTER, with its tables already created."""
+    if kind == 'memory':
+        return InMemorySaver()
+
+    if kind == 'sqlite':
+        from langgraph.checkpoint.sqlite import SqliteSaver
+
+        conn = sqlite3.connect(url, check_same_thread=False, timeout=30)
+        # WAL permite leitores enquanto outro processo escreve
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        saver = SqliteSaver(conn, serde=CompressedSerializer())
+        saver.setup()
+        return saver
+
+    if kind == 'postgres':
+        from langgraph.checkpoint.postgres import PostgresSaver
+        from psycopg.rows import dict_row
+        from psycopg_pool import ConnectionPool
+
+        pool = ConnectionPool(
+            url,
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            open=True,
+        )
+        saver = PostgresSaver(pool, serde=CompressedSerializer())
+        saver.setup()
+        return saver
+
+    raise ValueError(f"Unsupported CHECKPOINTER: {kind}")
+
+
+SQLITE_PRUNE = [
+    """
+    DELETE FROM checkpoints WHERE rowid IN (
+        SELECT rowid FROM (
+            SELECT rowid, ROW_NUMBER() OVER (PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC) AS position
+            FROM checkpoints WHERE thread_id = ?
+        ) WHERE position > ?
+    )
+    """,
+    """
+    DELETE FROM writes WHERE thread_id = ? AND NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns
+          AND c.checkpoint_id = writes.checkpoint_id
+    )
+    """,
+]
+
+POSTGRES_PRUNE = [
+    """
+    DELETE FROM checkpoints c WHERE c.thread_id = %(thread_id)s AND c.checkpoint_id NOT IN (
+        SELECT checkpoint_id FROM checkpoints
+        WHERE thread_id = %(thread_id)s AND checkpoint_ns = c.checkpoint_ns
+        ORDER BY checkpoint_id DESC LIMIT %(keep)s
+    )
+    """,
+    """
+    DELETE FROM checkpoint_writes w WHERE w.thread_id = %(thread_id)s AND NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns
+          AND c.checkpoint_id = w.checkpoint_id
+    )
+    """,
+    """
+    DELETE FROM checkpoint_blobs b WHERE b.thread_id = %(thread_id)s AND NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+          AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+    )
+    """,
+]
+
+
+def prune_checkpoints(saver, thread_id: str, keep: int = CHECKPOINTER_KEEP):
+    """Keep only the latest checkpoints of a conversation, removing older ones and their writes/blobs."""
+    try:
+        if isinstance(getattr(saver, "conn", None), sqlite3.Connection):
+            with saver.lock, saver.conn:
+                saver.conn.execute(SQLITE_PRUNE[0], (thread_id, keep))
+                saver.conn.execute(SQLITE_PRUNE[1], (thread_id,))
+        elif hasattr(saver, "_cursor"):
+            with saver._cursor() as cursor:
+                for statement in POSTGRES_PRUNE:
+                    cursor.execute(statement, {"thread_id": thread_id, "keep": keep})
+    except Exception as e:
+        logger.info(f"Falha ao remover checkpoints antigos: {e}", extra={"role": "checkpointer", "tool_name": None})
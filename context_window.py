@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from logger import logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Maior contexto permitido (o num_ctx configurado no Ollama)
+OLLAMA_NUM_CTX = int(os.getenv('OLLAMA_NUM_CTX', '128000'))
+# Tokens reservados para o raciocínio e a resposta do modelo
+CONTEXT_GENERATION_MARGIN = int(os.getenv('CONTEXT_GENERATION_MARGIN', '8192'))
+CONTEXT_MIN_NUM_CTX = int(os.getenv('CONTEXT_MIN_NUM_CTX', '8192'))
+# Chamadas seguidas que cabem num contexto menor antes de reduzir o num_ctx carregado
+CONTEXT_SHRINK_AFTER = int(os.getenv('CONTEXT_SHRINK_AFTER', '5'))
+# Estimativa conservadora (saídas de ferramentas em JSON ficam perto de 3 caracteres por token)
+CHARS_PER_TOKEN = 3
+
+
+def _buckets():
+    # Potências de 2 evitam recarregar o modelo a cada pequena variação do prompt
+    size = CONTEXT_MIN_NUM_CTX
+    while size < OLLAMA_NUM_CTX:
+        yield size
+        size *= 2
+    yield OLLAMA_NUM_CTX
+
+
+def bucket_num_ctx(tokens: int):
+    """Return the smallest context bucket that fits the given number of tokens."""
+    for size in _buckets():
+        if size >= tokens:
+            return size
+    return OLLAMA_NUM_CTX
+
+
+def _message_chars(msg):
+    content = msg.content if isinstance(msg.content, str) else json.dumps(msg.content, default=str)
+    tool_calls = getattr(msg, "tool_calls", None)
+    return len(content) + (len(json.dumps(tool_calls, default=str)) if tool_calls else 0)
+
+
+class ContextWindowMiddleware(AgentMiddleware):
+    """Choose num_ctx for each model call from the size of the prompt instead of always using the maximum.
+
+    The prompt size is the prompt_eval_count + eval_count reported by Ollama for the last
+    answer plus an estimate for the messages added after it, never less than a conservative
+    estimate of the whole prompt: after the first turn Ollama leaves the cached prefix out of
+    prompt_eval_count, and a prompt larger than num_ctx silently loses its beginning, system
+    prompt included.
+
+    Every change of num_ctx makes Ollama reload the model and drop its prefix cache, so the
+    chosen size never shrinks within a conversation (it is stored in the response_metadata of
+    each answer) and only shrinks after CONTEXT_SHRINK_AFTER consecutive calls that fit a
+    smaller bucket.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.last_num_ctx = None
+        self._smaller_calls = 0
+        self._lock = threading.Lock()
+        self._tools_chars = {}
+
+    def _tools_size(self, tools):
+        key = tuple(getattr(tool, "name", id(tool)) for tool in tools)
+        if key not in self._tools_chars:
+            self._tools_chars[key] = sum(len(json.dumps(convert_to_openai_tool(tool))) for tool in tools)
+        return self._tools_chars[key]
+
+    def estimate_prompt_tokens(self, request):
+        messages = request.messages
+        measured = 0
+        start = 0
+        for i in range(len(messages) - 1, -1, -1):
+            metadata = getattr(messages[i], "response_metadata", None) or {}
+            if metadata.get("prompt_eval_count") is not None:
+                measured = metadata["prompt_eval_count"] + metadata.get("eval_count", 0)
+                start = i + 1
+                break
+
+        fixed_chars = len(request.system_prompt or "") + self._tools_size(request.tools)
+        new_chars = sum(_message_chars(msg) for msg in messages[start:])
+        total_chars = fixed_chars + sum(_message_chars(msg) for msg in messages[:start]) + new_chars
+        if not measured:
+            new_chars += fixed_chars
+        return max(measured + new_chars // CHARS_PER_TOKEN, total_chars // CHARS_PER_TOKEN)
+
+    def choose_num_ctx(self, needed: int, thread_num_ctx: int = 0):
+        """Pick the num_ctx for a call that needs the given bucket in a conversation that already used thread_num_ctx."""
+        target = max(needed, thread_num_ctx)
+        with self._lock:
+            if self.last_num_ctx is not None and target < self.last_num_ctx:
+                self._smaller_calls += 1
+                if self._smaller_calls < CONTEXT_SHRINK_AFTER:
+                    return self.last_num_ctx
+            self._smaller_calls = 0
+            if target != self.last_num_ctx:
+                logger.info(f"num_ctx alterado de {self.last_num_ctx} para {target}", extra={"role": "context_window", "tool_name": None})
+            self.last_num_ctx = target
+            return target
+
+    def wrap_model_call(self, request, handler):
+        prompt_tokens = self.estimate_prompt_tokens(request)
+        thread_num_ctx = next(
+            (
+                msg.response_metadata["num_ctx"]
+                for msg in reversed(request.messages)
+                if "num_ctx" in (getattr(msg, "response_metadata", None) or {})
+            ),
+            0,
+        )
+        num_ctx = self.choose_num_ctx(bucket_num_ctx(prompt_tokens + CONTEXT_GENERATION_MARGIN), thread_num_ctx)
+        request.model = request.model.model_copy(update={"num_ctx": num_ctx})
+        response = handler(request)
+        for msg in response.result:
+            if isinstance(msg, AIMessage):
+                msg.response_metadata["num_ctx"] = num_ctx
+                msg.response_metadata["estimated_prompt_tokens"] = prompt_tokens
+        return response
@@ -0,0 +1,280 @@
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+import psycopg2
+import sqlglot
+from sqlglot import exp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = Path(__file__).resolve().parent
+
+DATABASE_URL = os.getenv('DATABASE_URL', 'issues.sqlite')
+# Sem DATABASE_TYPE, o tipo é deduzido da DATABASE_URL
+DATABASE_TYPE = os.getenv(
+    'DATABASE_TYPE',
+    'postgres' if DATABASE_URL.startswith(('postgres://', 'postgresql://')) else 'sqlite',
+)
+# Diretório com os snapshots Parquet gerados pelo snapshot.py
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', str(BASE_DIR / "snapshots"))
+
+TABLES = [
+    "repositories",
+    "issues",
+    "pull_requests",
+    "labels",
+    "issue_labels",
+    "pull_request_labels",
+    "comments",
+    "commits",
+    "users",
+]
+
+_ENUM_CAST_RE = re.compile(r"::\s*(issue_state_reason|issue_state|pull_request_state)\b", re.IGNORECASE)
+
+# Casts que o SQLite representa sem mudar o resultado (DATE vira date() no sqlglot)
+_SQLITE_CASTS = {
+    exp.DataType.Type.TEXT, exp.DataType.Type.VARCHAR, exp.DataType.Type.CHAR,
+    exp.DataType.Type.NVARCHAR, exp.DataType.Type.NCHAR,
+    exp.DataType.Type.INT, exp.DataType.Type.BIGINT, exp.DataType.Type.SMALLINT, exp.DataType.Type.TINYINT,
+    exp.DataType.Type.FLOAT, exp.DataType.Type.DOUBLE, exp.DataType.Type.DECIMAL,
+    exp.DataType.Type.BOOLEAN, exp.DataType.Type.DATE,
+}
+_SQLITE_DATETIME_CASTS = {
+    exp.DataType.Type.TIMESTAMP, exp.DataType.Type.TIMESTAMPTZ, exp.DataType.Type.DATETIME,
+}
+# Campos de EXTRACT e unidades de date_trunc com equivalente exato no strftime do SQLite
+_SQLITE_EXTRACT_FORMATS = {
+    "YEAR": "%Y", "MONTH": "%m", "DAY": "%d", "HOUR": "%H", "MINUTE": "%M", "SECOND": "%S",
+    "DOW": "%w", "DOY": "%j", "EPOCH": "%s",
+}
+_SQLITE_TRUNC_FORMATS = {
+    "YEAR": "%Y-01-01 00:00:00", "MONTH": "%Y-%m-01 00:00:00", "DAY": "%Y-%m-%d 00:00:00",
+    "HOUR": "%Y-%m-%d %H:00:00", "MINUTE": "%Y-%m-%d %H:%M:00",
+}
+_SQLITE_INTERVAL_UNITS = {
+    "SECOND": ("seconds", 1), "MINUTE": ("minutes", 1), "HOUR": ("hours", 1), "DAY": ("days", 1),
+    "WEEK": ("days", 7), "MONTH": ("months", 1), "YEAR": ("years", 1),
+}
+_INTERVAL_PART_RE = re.compile(r"(-?\d+)\s*([a-z]+?)s?\b", re.IGNORECASE)
+
+
+def _parse_postgres(query: str):
+    """Parse a single PostgreSQL statement, treating the enum types of the schema as text."""
+    statements = sqlglot.parse(_ENUM_CAST_RE.sub("::TEXT", query), read="postgres")
+    if len(statements) != 1 or statements[0] is None:
+        raise ValueError("Only a single SQL statement is supported")
+    return statements[0]
+
+
+def _format_results(columns, rows):
+    results = [dict(zip(columns, row)) for row in rows]
+    return json.dumps(results, indent=2, default=str)
+
+
+class PostgresBackend:
+    """Run queries against the PostgreSQL database in a read-only transaction."""
+
+    dialect = "postgres"
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def translate(self, query: str):
+        return query
+
+    def execute(self, query: str):
+        with psycopg2.connect(self.url, options='-c default_transaction_read_only=on') as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(self.translate(query))
+                rows = cursor.fetchall()
+                columns = [desc[0] for desc in cursor.description]
+                return _format_results(columns, rows)
+
+
+class DuckDBBackend:
+    """Run queries in-process with DuckDB over the Parquet snapshots of each table.
+
+    The snapshots are loaded once into a temporary DuckDB file, in both the ``public`` and
+    ``main`` schemas, which is then opened read-only without any file system access.
+    """
+
+    dialect = "duckdb"
+
+    def __init__(self, snapshot_dir: str):
+        import duckdb
+
+        self.snapshot_dir = Path(snapshot_dir)
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="duckdb-snapshot-")
+        path = str(Path(self._tmpdir.name) / "snapshot.duckdb")
+        with duckdb.connect(path) as conn:
+            conn.execute("CREATE SCHEMA IF NOT EXISTS public")
+            for table in TABLES:
+                parquet = self.snapshot_dir / f"{table}.parquet"
+                if parquet.exists():
+                    conn.execute(f"CREATE TABLE public.{table} AS SELECT * FROM read_parquet('{parquet.as_posix()}')")
+                    conn.execute(f"CREATE VIEW main.{table} AS SELECT * FROM public.{table}")
+
+        self._conn = duckdb.connect(path, read_only=True)
+        # Assim como no PostgreSQL, o SQL do modelo não pode ler nem escrever fora da base
+        self._conn.execute("SET enable_external_access = false")
+        self._conn.execute("SET lock_configuration = true")
+
+    def translate(self, query: str):
+        return _parse_postgres(query).sql(dialect="duckdb")
+
+    def execute(self, query: str):
+        # Cada cursor é uma conexão própria sobre o mesmo banco
+        cursor = self._conn.cursor()
+        try:
+            cursor.execute(self.translate(query))
+            rows = cursor.fetchall()
+            columns = [desc[0] for desc in cursor.description]
+            return _format_results(columns, rows)
+        finally:
+            cursor.close()
+
+
+class SQLiteBackend:
+    """Run queries in-process against a SQLite file loaded from the snapshots.
+
+    PostgreSQL date/time syntax (intervals, EXTRACT, date_trunc) is rewritten into SQLite date
+    functions; anything without an exact equivalent, such as subtracting two timestamps, raises
+    instead of silently returning a different result.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._timestamp_columns = None
+
+    def _connect(self):
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def timestamp_columns(self):
+        """Names of the columns declared with a date or time type in any table of the file."""
+        if self._timestamp_columns is None:
+            conn = self._connect()
+            try:
+                tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+                self._timestamp_columns = {
+                    name.lower()
+                    for table in tables
+                    for _, name, type_, *_ in conn.execute(f'PRAGMA table_info("{table}")')
+                    if "DATE" in (type_ or "").upper() or "TIME" in (type_ or "").upper()
+                }
+            finally:
+                conn.close()
+        return self._timestamp_columns
+
+    def _is_timestamp(self, node):
+        if isinstance(node, exp.Column):
+            return node.name.lower() in self.timestamp_columns()
+        if isinstance(node, exp.Cast):
+            return node.to.this in _SQLITE_DATETIME_CASTS or node.to.this == exp.DataType.Type.DATE
+        return isinstance(node, (exp.CurrentTimestamp, exp.CurrentDate))
+
+    def _modifiers(self, interval, sign):
+        text = interval.this.name if interval.unit is None else f"{interval.this.name} {interval.unit.name}"
+        parts = _INTERVAL_PART_RE.findall(text)
+        if not parts or _INTERVAL_PART_RE.sub("", text).strip():
+            raise ValueError(f"Interval {interval.sql()} is not supported by the SQLite backend")
+        modifiers = []
+        for amount, unit in parts:
+            if unit.upper() not in _SQLITE_INTERVAL_UNITS:
+                raise ValueError(f"Interval {interval.sql()} is not supported by the SQLite backend")
+            name, factor = _SQLITE_INTERVAL_UNITS[unit.upper()]
+            modifiers.append(exp.Literal.string(f"{sign * factor * int(amount):+d} {name}"))
+        return modifiers
+
+    def _strftime(self, format_, node):
+        return exp.Anonymous(this="STRFTIME", expressions=[exp.Literal.string(format_), node.transform(self._rewrite)])
+
+    def _rewrite(self, node):
+        if isinstance(node, exp.Table):
+            node.set("db", None)
+        elif isinstance(node, (exp.Add, exp.Sub)) and isinstance(node.expression, exp.Interval):
+            # ts ± INTERVAL 'n unidade' -> DATETIME(ts, '±n unidade')
+            sign = -1 if isinstance(node, exp.Sub) else 1
+            return exp.Anonymous(
+                this="DATETIME",
+                expressions=[node.this.transform(self._rewrite), *self._modifiers(node.expression, sign)],
+            )
+        elif isinstance(node, exp.Interval):
+            raise ValueError(f"Interval {node.sql()} is only supported when added to or subtracted from a timestamp")
+        elif isinstance(node, exp.Extract):
+            field = node.this.name.upper()
+            value = node.expression
+            if field == "EPOCH" and isinstance(value, exp.Sub) and self._is_timestamp(value.this) and self._is_timestamp(value.expression):
+                # Diferença em segundos, como EXTRACT(EPOCH FROM a - b) no PostgreSQL
+                days = exp.Sub(
+                    this=exp.Anonymous(this="JULIANDAY", expressions=[value.this.transform(self._rewrite)]),
+                    expression=exp.Anonymous(this="JULIANDAY", expressions=[value.expression.transform(self._rewrite)]),
+                )
+                return exp.Mul(this=exp.Paren(this=days), expression=exp.Literal.number(86400))
+            if field not in _SQLITE_EXTRACT_FORMATS:
+                raise ValueError(f"EXTRACT({field} FROM ...) is not supported by the SQLite backend")
+            return exp.Cast(this=self._strftime(_SQLITE_EXTRACT_FORMATS[field], value), to=exp.DataType.build("INT"))
+        elif isinstance(node, (exp.TimestampTrunc, exp.DateTrunc)):
+            unit = node.unit.name.upper() if node.unit is not None else ""
+            if unit == "WEEK":
+                # Semanas do PostgreSQL começam na segunda-feira
+                return exp.Anonymous(this="DATETIME", expressions=[
+                    node.this.transform(self._rewrite),
+                    exp.Literal.string("-6 days"), exp.Literal.string("weekday 1"), exp.Literal.string("start of day"),
+                ])
+            if unit not in _SQLITE_TRUNC_FORMATS:
+                raise ValueError(f"date_trunc('{unit.lower()}', ...) is not supported by the SQLite backend")
+            return self._strftime(_SQLITE_TRUNC_FORMATS[unit], node.this)
+        elif isinstance(node, exp.Sub) and (self._is_timestamp(node.this) or self._is_timestamp(node.expression)):
+            raise ValueError(
+                "Subtracting timestamps is not supported by the SQLite backend; "
+                "use EXTRACT(EPOCH FROM a - b) to get the difference in seconds"
+            )
+        elif isinstance(node, exp.Cast):
+            type_ = node.to.this
+            if type_ in _SQLITE_DATETIME_CASTS:
+                return exp.Anonymous(this="DATETIME", expressions=[node.this.transform(self._rewrite)])
+            if type_ not in _SQLITE_CASTS:
+                raise ValueError(f"Cast to {node.to.sql()} is not supported by the SQLite backend")
+        return node
+
+    def translate(self, query: str):
+        return _parse_postgres(query).transform(self._rewrite).sql(dialect="sqlite")
+
+    def execute(self, query: str):
+        conn = self._connect()
+        try:
+            cursor = conn.execute(self.translate(query))
+            rows = cursor.fetchall()
+            columns = [desc[0] for desc in cursor.description]
+            return _format_results(columns, rows)
+        finally:
+            conn.close()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the backend selected by DATABASE_TYPE, created once per process."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if DATABASE_TYPE in ('postgres', 'postgresql'):
+                    _backend = PostgresBackend(DATABASE_URL)
+                elif DATABASE_TYPE == 'duckdb':
+                    _backend = DuckDBBackend(SNAPSHOT_DIR)
+                elif DATABASE_TYPE == 'sqlite':
+                    _backend = SQLiteBackend(DATABASE_URL)
+                else:
+                    raise ValueError(f"Unsupported DATABASE_TYPE: {DATABASE_TYPE}")
+    return _backend
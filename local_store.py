@@ -0,0 +1,282 @@
+import os
+import psycopg2
+from database import DATABASE_TYPE
+from similarity import index_issue
+from logger import logger
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Uma linha local só é usada se foi sincronizada com a API do GitHub há menos que esse tempo
+LOCAL_STORE_TTL_HOURS = float(os.getenv('LOCAL_STORE_TTL_HOURS', '24'))
+# Issues que nunca passaram pela API (vindas da carga inicial) são usadas se estiverem fechadas
+# ou sem atualização há pelo menos esse número de dias
+LOCAL_STORE_SETTLED_DAYS = float(os.getenv('LOCAL_STORE_SETTLED_DAYS', '30'))
+
+# Valores aceitos pelo enum issue_state_reason; o GitHub também devolve outros, como duplicate
+ISSUE_STATE_REASONS = {"completed", "not_planned", "reopened"}
+
+SCHEMA_DDL = """
+CREATE TABLE IF NOT EXISTS public.users
+(
+    login        VARCHAR(255) PRIMARY KEY,
+    name         VARCHAR(255),
+    company      VARCHAR(255),
+    blog         TEXT,
+    location     VARCHAR(255),
+    email        VARCHAR(255),
+    type         VARCHAR(50),
+    public_repos INTEGER,
+    url          TEXT,
+    html_url     TEXT,
+    created_at   TIMESTAMPTZ,
+    updated_at   TIMESTAMPTZ,
+    synced_at    TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS public.issue_syncs
+(
+    issue_id  VARCHAR(255) PRIMARY KEY
+        REFERENCES public.issues (id) ON DELETE CASCADE,
+    synced_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""
+
+_schema_ready = False
+
+
+def _enabled():
+    # Os backends embutidos são snapshots somente leitura
+    return DATABASE_TYPE in ('postgres', 'postgresql')
+
+
+def _connect():
+    return psycopg2.connect(os.environ['DATABASE_URL'])
+
+
+def _ensure_schema(conn):
+    global _schema_ready
+    if _schema_ready:
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_DDL)
+    conn.commit()
+    _schema_ready = True
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def get_issue(owner: str, repo: str, issue_number: int):
+    """Return the issue from public.issues in the same shape as the GitHub tool, or None on miss/stale.
+
+    Issues written by upsert_issue are fresh for LOCAL_STORE_TTL_HOURS after their sync. The other
+    rows are only used when they look settled: closed, or not updated for LOCAL_STORE_SETTLED_DAYS.
+    """
+    if not _enabled():
+        return None
+    try:
+        with _connect() as conn:
+            _ensure_schema(conn)
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT i.id, i."number", i.title, i.body, i.author, i.state::text, i.url,
+                           i.created_at, i.updated_at, i.closed_at, i.comments_count, i.closed_by,
+                           COALESCE(array_agg(il.label_name) FILTER (WHERE il.label_name IS NOT NULL), '{}')
+                    FROM public.issues i
+                    LEFT JOIN public.issue_syncs s ON s.issue_id = i.id
+                    LEFT JOIN public.issue_labels il ON il.issue_id = i.id
+                    WHERE i.repository_owner = %s AND i.repository_name = %s AND i."number" = %s
+                      AND CASE
+                          WHEN s.synced_at IS NOT NULL THEN s.synced_at > NOW() - %s * INTERVAL '1 hour'
+                          ELSE i.state = 'closed' OR i.updated_at < NOW() - %s * INTERVAL '1 day'
+                      END
+                    GROUP BY i.id, s.synced_at
+                    ORDER BY s.synced_at DESC NULLS LAST
+                    LIMIT 1
+                    """,
+                    (owner, repo, issue_number, LOCAL_STORE_TTL_HOURS, LOCAL_STORE_SETTLED_DAYS),
+                )
+                row = cursor.fetchone()
+    except Exception as e:
+        logger.info(f"Local issue lookup failed: {e}", extra={"role": "local_store", "tool_name": "get_repository_issue_info"})
+        return None
+
+    if row is None:
+        return None
+
+    api_url = f"https://api.github.com/repos/{owner}/{repo}/issues/{issue_number}"
+    return {
+        "url": api_url,
+        "repository_url": f"https://api.github.com/repos/{owner}/{repo}",
+        "comments_url": f"{api_url}/comments",
+        "events_url": f"{api_url}/events",
+        "html_url": row[6],
+        "id": row[0],
+        "number": row[1],
+        "title": row[2],
+        "user": row[4],
+        "labels": list(row[12]),
+        "state": row[5],
+        "comments": row[10],
+        "created_at": _iso(row[7]),
+        "updated_at": _iso(row[8]),
+        "closed_at": _iso(row[9]),
+        "body": row[3],
+        "closed_by": row[11],
+        "timeline_url": f"{api_url}/timeline",
+    }
+
+
+def upsert_issue(owner: str, repo: str, issue: dict):
+    """Write an issue fetched from the GitHub API into public.issues, public.labels and public.issue_labels.
+
+    An existing row with the same repository and number is updated in place, whatever id it was
+    loaded with. New issues are only stored (and added to the vector index) when their repository
+    already exists in public.repositories.
+    """
+    if not _enabled():
+        return
+    if issue.get("pull_request"):
+        return
+    user = issue.get("user") or {}
+    closed_by = issue.get("closed_by") or {}
+    state_reason = issue.get("state_reason") if issue.get("state_reason") in ISSUE_STATE_REASONS else None
+    values = (
+        issue.get("title"), issue.get("body"), issue.get("state"), issue.get("updated_at"),
+        issue.get("closed_at"), issue.get("comments", 0), closed_by.get("login"), state_reason,
+    )
+    try:
+        with _connect() as conn:
+            _ensure_schema(conn)
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT id FROM public.issues
+                    WHERE repository_owner = %s AND repository_name = %s AND "number" = %s
+                    ORDER BY id LIMIT 1
+                    """,
+                    (owner, repo, issue.get("number")),
+                )
+                row = cursor.fetchone()
+                if row is not None:
+                    issue_id = row[0]
+                    cursor.execute(
+                        """
+                        UPDATE public.issues SET
+                            title = %s, body = %s, state = %s::issue_state, updated_at = %s, closed_at = %s,
+                            comments_count = %s, closed_by = %s, state_reason = %s::issue_state_reason
+                        WHERE id = %s
+                        """,
+                        (*values, issue_id),
+                    )
+                else:
+                    # Mesmo formato de id da carga inicial (o id numérico da API REST)
+                    issue_id = str(issue.get("id"))
+                    cursor.execute(
+                        """
+                        INSERT INTO public.issues
+                            (id, "number", author, url, created_at, repository_owner, repository_name,
+                             title, body, state, updated_at, closed_at, comments_count, closed_by, state_reason)
+                        SELECT %s, %s, %s, %s, %s, %s, %s,
+                               %s, %s, %s::issue_state, %s, %s, %s, %s, %s::issue_state_reason
+                        WHERE EXISTS (SELECT 1 FROM public.repositories WHERE owner = %s AND name = %s)
+                        ON CONFLICT (id) DO NOTHING
+                        """,
+                        (
+                            issue_id, issue.get("number"), user.get("login"), issue.get("html_url"),
+                            issue.get("created_at"), owner, repo, *values, owner, repo,
+                        ),
+                    )
+                    if cursor.rowcount == 0:
+                        return
+
+                cursor.execute(
+                    """
+                    INSERT INTO public.issue_syncs (issue_id, synced_at) VALUES (%s, NOW())
+                    ON CONFLICT (issue_id) DO UPDATE SET synced_at = NOW()
+                    """,
+                    (issue_id,),
+                )
+                labels = issue.get("labels", [])
+                cursor.execute("DELETE FROM public.issue_labels WHERE issue_id = %s", (issue_id,))
+                for label in labels:
+                    cursor.execute(
+                        "INSERT INTO public.labels (name, color) VALUES (%s, %s) ON CONFLICT (name) DO NOTHING",
+                        (label.get("name"), f"#{label.get('color', '000000')}"),
+                    )
+                    cursor.execute(
+                        "INSERT INTO public.issue_labels (issue_id, label_name) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+                        (issue_id, label.get("name")),
+                    )
+        # O índice vetorial deste processo passa a encontrar a issue antes do próximo update_index
+        index_issue(issue_id, owner, repo, issue)
+    except Exception as e:
+        logger.info(f"Local issue upsert failed: {e}", extra={"role": "local_store", "tool_name": "get_repository_issue_info"})
+
+
+def get_user(login: str):
+    """Return the user from public.users in the same shape as the GitHub tool, or None on miss/stale."""
+    if not _enabled():
+        return None
+    try:
+        with _connect() as conn:
+            _ensure_schema(conn)
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT login, url, html_url, name, company, blog, location, public_repos, email, type
+                    FROM public.users
+                    WHERE lower(login) = lower(%s) AND synced_at > NOW() - %s * INTERVAL '1 hour'
+                    """,
+                    (login, LOCAL_STORE_TTL_HOURS),
+                )
+                row = cursor.fetchone()
+    except Exception as e:
+        logger.info(f"Local user lookup failed: {e}", extra={"role": "local_store", "tool_name": "get_user_info"})
+        return None
+
+    if row is None:
+        return None
+
+    keys = ["login", "url", "html_url", "name", "company", "blog", "location", "public_repos", "email", "type"]
+    return dict(zip(keys, row))
+
+
+def upsert_user(user: dict):
+    """Write a user fetched from the GitHub API into public.users."""
+    if not _enabled():
+        return
+    try:
+        with _connect() as conn:
+            _ensure_schema(conn)
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO public.users
+                        (login, name, company, blog, location, email, type, public_repos, url, html_url,
+                         created_at, updated_at, synced_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+                    ON CONFLICT (login) DO UPDATE SET
+                        name = EXCLUDED.name,
+                        company = EXCLUDED.company,
+                        blog = EXCLUDED.blog,
+                        location = EXCLUDED.location,
+                        email = EXCLUDED.email,
+                        type = EXCLUDED.type,
+                        public_repos = EXCLUDED.public_repos,
+                        url = EXCLUDED.url,
+                        html_url = EXCLUDED.html_url,
+                        updated_at = EXCLUDED.updated_at,
+                        synced_at = NOW()
+                    """,
+                    (
+                        user.get("login"), user.get("name"), user.get("company"), user.get("blog"),
+                        user.get("location"), user.get("email"), user.get("type"), user.get("public_repos"),
+                        user.get("url"), user.get("html_url"), user.get("created_at"), user.get("updated_at"),
+                    ),
+                )
+    except Exception as e:
+        logger.info(f"Local user upsert failed: {e}", extra={"role": "local_store", "tool_name": "get_user_info"})
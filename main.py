@@ -1,32 +1,37 @@
 from langchain_ollama import ChatOllama
 # from langgraph.prebuilt import create_react_agent
 from langchain.agents import create_agent
-from langgraph.checkpoint.memory import InMemorySaver
 from tools import *
 import os
+import json
 import logging
 from logger import logger
+from budget import BudgetMiddleware, QuestionBudget
+from context_window import ContextWindowMiddleware, OLLAMA_NUM_CTX
+from checkpointer import get_checkpointer, prune_checkpoints
+from query_memory import remember, recall, template_sql, build_context, forget, is_reusable
 from dotenv import load_dotenv
 
 load_dotenv()
 
-database_type = os.getenv('DATABASE_TYPE', 'sqlite')
-database_url = os.getenv('DATABASE_URL', 'issues.sqlite')
-
 llm = ChatOllama(
     model="gpt-oss:120b",
     reasoning="high",
-    num_ctx=128000,
+    num_ctx=OLLAMA_NUM_CTX,
 )
 
 prompt = (
-    f"Você é um assistente que sempre deve consultar a base de dados PostgreSQL definida em {os.getenv('DATABASE_URL')} "
+    # O prompt não deve variar entre requisições para o Ollama reaproveitar o cache do prefixo
+    "Você é um assistente que sempre deve consultar a base de dados PostgreSQL "
     "usando a ferramenta 'sql_query_executor' com a sintaxe do PostgreSQL antes de qualquer outra ação. "
     "Sempre tente responder a pergunta consultando essa base primeiro. "
     "Somente se a informação não estiver lá, use outras ferramentas. "
     "Evite chamadas desnecessárias e pare quando tiver informações suficientes."
 )
-        
+
+context_window = ContextWindowMiddleware()
+checkpointer = get_checkpointer()
+
 agent = create_agent(
     llm,
     tools=[
@@ -36,25 +41,81 @@ agent = create_agent(
         github_search,
         visit_url,
         get_repository_issue_info,
+        find_similar_items,
     ],
-    checkpointer=InMemorySaver(),
-    system_prompt=prompt
+    checkpointer=checkpointer,
+    system_prompt=prompt,
+    middleware=[BudgetMiddleware(), context_window],
+    context_schema=QuestionBudget,
 )
 
-config = {
-    "configurable": {"thread_id": "1"},
-    "recursion_limit": 100
-}
+def get_config(thread_id: str = "1"):
+    return {
+        "configurable": {"thread_id": thread_id},
+        "recursion_limit": 100
+    }
+
+def prepare_question(question: str):
+    """Enriquece a pergunta com consultas que já funcionaram para perguntas parecidas."""
+    examples = recall(question)
+    if not examples:
+        return question
+
+    score, record = examples[0]
+    sql = template_sql(question, score, record)
+    if sql is not None:
+        result = sql_query_executor.invoke({"query": sql})
+        if result.startswith("Error executing SQL query"):
+            # A consulta memorizada não roda mais, então não deve ser sugerida de novo
+            forget(record["sql"])
+            examples = examples[1:]
+        elif is_reusable(sql, result):
+            logger.info(f"Reaproveitando consulta memorizada (similaridade {score:.2f}): {sql}", extra={"role": "query_memory", "tool_name": "sql_query_executor"})
+            return (
+                f"A consulta abaixo já foi executada na base para esta pergunta:\n{sql}\n"
+                f"Resultado:\n{result}\n\n"
+                f"Use esse resultado para responder e só consulte novamente se ele não for suficiente.\n\n"
+                f"Pergunta: {question}"
+            )
+
+    if not examples:
+        return question
+    logger.info(f"{len(examples)} consultas memorizadas enviadas como exemplo", extra={"role": "query_memory", "tool_name": None})
+    return build_context(question, examples)
+
+def remember_queries(question: str, messages):
+    """Guarda a última consulta SQL bem sucedida feita para responder a pergunta."""
+    turn = []
+    for msg in reversed(messages):
+        if getattr(msg, "type", None) == "human":
+            break
+        turn.append(msg)
 
-def main_function(question: str):
+    queries = {}
+    last_success = None
+    for msg in reversed(turn):
+        for tool_call in getattr(msg, "tool_calls", None) or []:
+            if tool_call.get("name") == "sql_query_executor":
+                queries[tool_call.get("id")] = tool_call.get("args", {}).get("query")
+        if getattr(msg, "type", None) == "tool" and msg.tool_call_id in queries:
+            if is_reusable(queries[msg.tool_call_id], str(msg.content)):
+                last_success = (queries[msg.tool_call_id], msg.content)
+
+    if last_success is not None:
+        remember(question, *last_success)
+
+def main_function(question: str, thread_id: str = "1"):
     final_answer = None
-    tool_calls = 0
+    messages = []
+    budget = QuestionBudget()
     for step in agent.stream(
-        {"messages": [{"role": "user", "content": question}]},
-        config,
+        {"messages": [{"role": "user", "content": prepare_question(question)}]},
+        get_config(thread_id),
         stream_mode="values",
+        context=budget,
     ):
-        last_msg = step["messages"][-1]
+        messages = step["messages"]
+        last_msg = messages[-1]
         role = getattr(last_msg, "type", getattr(last_msg, "role", "unknown"))
         tool_name = getattr(last_msg, "name", None)
 
@@ -75,9 +136,13 @@ def main_function(question: str):
                 f"Tempo para gerar tokens: {metada.get('eval_duration', 'N/A') / 10**9} segundos\n"
             , extra={"role": role, "tool_name": tool_name}
             )
-        
-        if hasattr(last_msg, "tool_calls") and last_msg.tool_calls:
-            tool_calls += 1
 
-    logger.info(f"Quantidade total de chamadas de ferramentas feitas para a pergunta [{question}]: {tool_calls}", extra={"role": "summary", "tool_name": None})
-    return final_answer
\ No newline at end of file
+    usage = budget.usage()
+    last_metadata = next((msg.response_metadata for msg in reversed(messages) if getattr(msg, "type", None) == "ai"), {})
+    usage["num_ctx"] = last_metadata.get("num_ctx")
+    usage["prompt_tokens"] = last_metadata.get("estimated_prompt_tokens")
+    logger.info(f"Quantidade total de chamadas de ferramentas feitas para a pergunta [{question}]: {usage['tool_calls']['used']}", extra={"role": "summary", "tool_name": None})
+    logger.info(f"Uso do orçamento para a pergunta [{question}]: {json.dumps(usage)}", extra={"role": "summary", "tool_name": None})
+    remember_queries(question, messages)
+    prune_checkpoints(checkpointer, thread_id)
+    return final_answer, usage
\ No newline at end of file
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
 
 class LLM_Request(BaseModel):
-    request: str
\ No newline at end of file
+    request: str
+    thread_id: str = "1"
\ No newline at end of file
@@ -0,0 +1,195 @@
+import json
+import math
+import os
+import re
+import sqlite3
+from collections import Counter
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = Path(__file__).resolve().parent
+QUERY_MEMORY_PATH = os.getenv('QUERY_MEMORY_PATH', str(BASE_DIR / "query_memory.sqlite"))
+# Similaridade mínima para um exemplo ser injetado no prompt
+QUERY_MEMORY_MIN_SCORE = float(os.getenv('QUERY_MEMORY_MIN_SCORE', '0.5'))
+# Similaridade mínima para reaproveitar o SQL direto como template
+QUERY_MEMORY_TEMPLATE_SCORE = float(os.getenv('QUERY_MEMORY_TEMPLATE_SCORE', '0.9'))
+
+_LITERAL_RE = re.compile(r"""'[^']*'|"[^"]*"|\b[\w.-]+/[\w.-]+\b|\b\d+\b""")
+_WORD_RE = re.compile(r"\w+")
+_SQL_STRING_RE = re.compile(r"('(?:[^']|'')*')")
+# Consultas que só exploram o schema não respondem nenhuma pergunta
+_SCHEMA_DISCOVERY_RE = re.compile(r"\b(information_schema|pg_catalog|pg_tables|pg_class|pg_attribute|pg_type|sqlite_master)\b", re.IGNORECASE)
+
+
+def _connect():
+    conn = sqlite3.connect(QUERY_MEMORY_PATH)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS query_memory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT NOT NULL,
+            template TEXT NOT NULL,
+            sql TEXT NOT NULL,
+            columns TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (template, sql)
+        )
+        """
+    )
+    return conn
+
+
+def _literals(text: str):
+    return [match.strip("'\"") for match in _LITERAL_RE.findall(text)]
+
+
+def _template(text: str):
+    """Replace the literals of a question (numbers, quoted strings, owner/repo) by placeholders."""
+    return _LITERAL_RE.sub("?", text.lower()).strip()
+
+
+def _vector(text: str):
+    return Counter(_WORD_RE.findall(_template(text)))
+
+
+def _replace_number(sql: str, old: str, new: str):
+    """Replace a number that appears exactly once as a standalone token outside SQL strings, or return None."""
+    token = re.compile(rf"(?<![\w.]){old}(?![\w.])")
+    parts = _SQL_STRING_RE.split(sql)
+    # Partes ímpares são strings entre aspas
+    if any(old in part for part in parts[1::2]):
+        return None
+    if sum(len(token.findall(part)) for part in parts[0::2]) != 1:
+        return None
+    return "".join(part if i % 2 else token.sub(new, part) for i, part in enumerate(parts))
+
+
+def _replace_strings(sql: str, strings: dict):
+    """Replace whole quoted literals in a single pass, or return None unless each appears exactly once."""
+    parts = _SQL_STRING_RE.split(sql)
+    # Partes ímpares são strings entre aspas
+    counts = Counter(parts[1::2])
+    if any(counts[key] != 1 for key in strings):
+        return None
+    return "".join(strings.get(part, part) if i % 2 else part for i, part in enumerate(parts))
+
+
+def is_reusable(sql: str, result: str):
+    """Whether a successful query is worth remembering: it returned rows and is not schema discovery."""
+    if _SCHEMA_DISCOVERY_RE.search(sql):
+        return False
+    try:
+        rows = json.loads(result)
+    except ValueError:
+        return False
+    return isinstance(rows, list) and len(rows) > 0
+
+
+def _cosine(a: Counter, b: Counter):
+    dot = sum(count * b[word] for word, count in a.items())
+    if not dot:
+        return 0.0
+    norm = math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values()))
+    return dot / norm
+
+
+def remember(question: str, sql: str, result: str):
+    """Store a question together with the SQL that answered it and the shape of its result."""
+    if not is_reusable(sql, result):
+        return
+    rows = json.loads(result)
+    columns = list(rows[0].keys()) if rows else []
+    with _connect() as conn:
+        conn.execute(
+            """
+            INSERT INTO query_memory (question, template, sql, columns, row_count)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (template, sql) DO UPDATE SET
+                question = excluded.question,
+                columns = excluded.columns,
+                row_count = excluded.row_count,
+                hits = hits + 1
+            """,
+            (question, _template(question), sql, json.dumps(columns), len(rows)),
+        )
+
+
+def recall(question: str, k: int = 3):
+    """Return up to k stored records most similar to the question, as (score, record) pairs."""
+    query_vector = _vector(question)
+    with _connect() as conn:
+        rows = conn.execute("SELECT question, sql, columns, row_count FROM query_memory").fetchall()
+
+    scored = []
+    for stored_question, sql, columns, row_count in rows:
+        score = _cosine(query_vector, _vector(stored_question))
+        if score >= QUERY_MEMORY_MIN_SCORE:
+            scored.append((score, {
+                "question": stored_question,
+                "sql": sql,
+                "columns": json.loads(columns),
+                "row_count": row_count,
+            }))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return scored[:k]
+
+
+def template_sql(question: str, score: float, record: dict):
+    """Rewrite the SQL of a stored record with the literals of the new question.
+
+    Returns None when the match is not confident enough or the literals cannot be mapped safely.
+    """
+    if score < QUERY_MEMORY_TEMPLATE_SCORE or _template(question) != _template(record["question"]):
+        return None
+    old_literals = _literals(record["question"])
+    new_literals = _literals(question)
+    if len(old_literals) != len(new_literals):
+        return None
+
+    sql = record["sql"]
+    # Literais entre aspas trocados de uma vez no fim, para uma troca não atingir a outra
+    strings = {}
+    for old, new in zip(old_literals, new_literals):
+        if old == new and "/" not in old:
+            continue
+        if "/" in old:
+            old_owner, old_repo = old.split("/", 1)
+            new_owner, new_repo = new.split("/", 1)
+            pairs = [(old_owner, new_owner), (old_repo, new_repo)]
+        elif old.isdigit():
+            if not new.isdigit():
+                return None
+            sql = _replace_number(sql, old, new)
+            if sql is None:
+                return None
+            continue
+        else:
+            pairs = [(old, new)]
+        for old_value, new_value in pairs:
+            key = f"'{old_value}'"
+            value = "'" + new_value.replace("'", "''") + "'"
+            if strings.setdefault(key, value) != value:
+                return None
+    return _replace_strings(sql, strings)
+
+
+def forget(sql: str):
+    """Remove a stored query, e.g. when it no longer runs."""
+    with _connect() as conn:
+        conn.execute("DELETE FROM query_memory WHERE sql = ?", (sql,))
+
+
+def build_context(question: str, examples):
+    """Format the recalled examples to be sent together with the user's question."""
+    lines = ["Consultas SQL que já funcionaram para perguntas parecidas:"]
+    for score, record in examples:
+        lines.append(
+            f"- Pergunta: {record['question']}\n"
+            f"  SQL: {record['sql']}\n"
+            f"  Colunas retornadas: {', '.join(record['columns'])} ({record['row_count']} linhas)"
+        )
+    return "\n".join(lines) + f"\n\nPergunta: {question}"
@@ -7,5 +7,5 @@ app = FastAPI()
 @app.post("/get_infos")
 async def get_infos(request: LLM_Request):
     question = request.request
-    final_answer = main_function(question)
-    return {"answer": final_answer}
\ No newline at end of file
+    final_answer, usage = main_function(question, request.thread_id)
+    return {"answer": final_answer, "usage": usage}
\ No newline at end of file
@@ -0,0 +1,290 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+import numpy as np
+from database import get_backend
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = Path(__file__).resolve().parent
+VECTOR_INDEX_DIR = os.getenv('VECTOR_INDEX_DIR', str(BASE_DIR / "vector_index"))
+# hashing (local e determinístico) ou ollama
+EMBEDDER = os.getenv('EMBEDDER', 'hashing')
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'nomic-embed-text')
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '256'))
+# Quantidade máxima de caracteres do corpo usada no embedding
+EMBEDDING_MAX_BODY = 2000
+
+_WORD_RE = re.compile(r"\w+")
+
+SOURCES = {
+    "issue": "public.issues",
+    "pull_request": "public.pull_requests",
+}
+COLUMNS = "id, \"number\", title, body, url, repository_owner, repository_name, updated_at"
+
+
+class HashingEmbedder:
+    """Embed texts by hashing their words and word bigrams into a fixed number of buckets."""
+
+    def __init__(self, dim: int = 1024):
+        self.name = "hashing"
+        self.dim = dim
+
+    def _features(self, text: str):
+        words = _WORD_RE.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts):
+        rows, digests = [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                rows.append(row)
+                digests.append(int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little"))
+        digests = np.asarray(digests, dtype=np.uint64)
+        signs = np.where(digests & np.uint64(1), 1.0, -1.0).astype(np.float32)
+        columns = ((digests >> np.uint64(1)) % np.uint64(self.dim)).astype(np.int64)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.int64), columns), signs)
+        return _normalize(matrix)
+
+
+class OllamaEmbedder:
+    """Embed texts with an embedding model served by Ollama."""
+
+    def __init__(self, model: str):
+        from langchain_ollama import OllamaEmbeddings
+
+        self.name = f"ollama:{model}"
+        # Só é conhecida depois do primeiro embedding
+        self.dim = None
+        self._embeddings = OllamaEmbeddings(model=model, base_url=os.getenv('OLLAMA_BASE_URL'))
+
+    def embed(self, texts):
+        return _normalize(np.asarray(self._embeddings.embed_documents(list(texts)), dtype=np.float32))
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def get_embedder():
+    if EMBEDDER == 'hashing':
+        return HashingEmbedder()
+    if EMBEDDER == 'ollama':
+        return OllamaEmbedder(EMBEDDING_MODEL)
+    raise ValueError(f"Unsupported EMBEDDER: {EMBEDDER}")
+
+
+class VectorIndex:
+    """Float32 matrix of normalized embeddings with the metadata of each indexed issue or pull request.
+
+    The matrix is stored in ``vectors.npy`` and the metadata in ``items.json`` inside ``path``,
+    together with the name and dimension of the embedder that built it.
+    """
+
+    def __init__(self, path: str, embedder, load: bool = True):
+        self.path = Path(path)
+        self.embedder = embedder
+        self.items = []
+        self.watermarks = {}
+        self.matrix = None
+        self._positions = {}
+        self._mtime = None
+        self._lock = threading.RLock()
+        if load:
+            self.reload()
+
+    def _stored_mtime(self):
+        # items.json é gravado por último e sempre substituído por um arquivo novo, então marca um índice completo
+        try:
+            stat = (self.path / "items.json").stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino
+
+    def reload(self):
+        """Load the index stored in ``path``, refusing one built by a different embedder."""
+        mtime = self._stored_mtime()
+        if mtime is None:
+            return
+        with open(self.path / "items.json") as f:
+            data = json.load(f)
+        matrix = np.load(self.path / "vectors.npy")
+        dim = data.get("dim")
+        if data.get("embedder") != self.embedder.name or self.embedder.dim not in (None, dim) or matrix.shape[1] != dim:
+            raise ValueError(
+                f"Vector index in {self.path} was built with {data.get('embedder')} ({dim} dimensions), "
+                f"not {self.embedder.name} ({self.embedder.dim} dimensions); rebuild it with --rebuild"
+            )
+        if matrix.shape[0] != len(data["items"]):
+            # Outro processo está no meio de um save; tenta de novo na próxima chamada
+            return
+        with self._lock:
+            self.items = data["items"]
+            self.watermarks = data["watermarks"]
+            self.matrix = matrix
+            self._positions = {item["key"]: i for i, item in enumerate(self.items)}
+            self._mtime = mtime
+
+    def reload_if_changed(self):
+        """Reload the index when another process (e.g. ``python similarity.py``) saved a newer one."""
+        if self._stored_mtime() != self._mtime:
+            self.reload()
+
+    def save(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            # Arquivos temporários + os.replace para que leitores nunca vejam um arquivo pela metade
+            with open(self.path / "vectors.npy.tmp", "wb") as f:
+                np.save(f, self.matrix)
+            os.replace(self.path / "vectors.npy.tmp", self.path / "vectors.npy")
+            with open(self.path / "items.json.tmp", "w") as f:
+                json.dump({
+                    "embedder": self.embedder.name,
+                    "dim": None if self.matrix is None else int(self.matrix.shape[1]),
+                    "items": self.items,
+                    "watermarks": self.watermarks,
+                }, f)
+            os.replace(self.path / "items.json.tmp", self.path / "items.json")
+            self._mtime = self._stored_mtime()
+
+    def upsert(self, items, texts):
+        """Add or replace items (dicts with a unique ``key``) embedding the given texts in batches."""
+        for start in range(0, len(items), EMBEDDING_BATCH_SIZE):
+            with self._lock:
+                self._upsert_batch(items[start:start + EMBEDDING_BATCH_SIZE], texts[start:start + EMBEDDING_BATCH_SIZE])
+
+    def _upsert_batch(self, batch, texts):
+        vectors = self.embedder.embed(texts)
+        if self.matrix is None:
+            self.matrix = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        elif vectors.shape[1] != self.matrix.shape[1]:
+            raise ValueError(f"Embedder returned {vectors.shape[1]} dimensions, the index has {self.matrix.shape[1]}")
+
+        new_rows = []
+        for item, vector in zip(batch, vectors):
+            position = self._positions.get(item["key"])
+            if position is None:
+                self._positions[item["key"]] = len(self.items)
+                self.items.append(item)
+                new_rows.append(vector)
+            else:
+                self.items[position] = item
+                self.matrix[position] = vector
+        if new_rows:
+            self.matrix = np.vstack([self.matrix, np.asarray(new_rows, dtype=np.float32)])
+
+    def search(self, text: str, k: int = 5, kind: str = None):
+        """Return the k most similar items to the text with their cosine similarity.
+
+        Raises ValueError when the index was never built or the kind is unknown, so that an
+        empty result always means that nothing similar was found.
+        """
+        if kind is not None and kind not in SOURCES:
+            raise ValueError(f"Unknown kind {kind!r}, expected one of: {', '.join(SOURCES)}")
+        query = self.embedder.embed([text])[0]
+        with self._lock:
+            if self.matrix is None or not len(self.items):
+                raise ValueError(f"The vector index in {self.path} is empty; build it with `python similarity.py`")
+            scores = self.matrix @ query
+            if kind is not None:
+                mask = np.fromiter((item["kind"] == kind for item in self.items), dtype=bool, count=len(self.items))
+                scores = np.where(mask, scores, -np.inf)
+            k = max(1, min(k, len(self.items)))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {**self.items[i], "score": round(float(scores[i]), 4)}
+                for i in top
+                if np.isfinite(scores[i])
+            ]
+
+
+def _upsert_rows(index: VectorIndex, kind: str, rows):
+    items = [
+        {
+            "key": f"{kind}:{row['id']}",
+            "kind": kind,
+            "id": row["id"],
+            "number": row["number"],
+            "title": row["title"],
+            "url": row["url"],
+            "repository": f"{row['repository_owner']}/{row['repository_name']}",
+        }
+        for row in rows
+    ]
+    texts = [f"{row['title']}\n{(row['body'] or '')[:EMBEDDING_MAX_BODY]}" for row in rows]
+    index.upsert(items, texts)
+
+
+def update_index(index: VectorIndex):
+    """Embed the issues and pull requests created or updated since the last run."""
+    backend = get_backend()
+    for kind, table in SOURCES.items():
+        watermark = index.watermarks.get(kind)
+        # >= para não perder itens com o mesmo updated_at do fim da última execução
+        where = f" WHERE updated_at >= '{watermark}'" if watermark else ""
+        offset = 0
+        while True:
+            rows = json.loads(backend.execute(
+                f"SELECT {COLUMNS} FROM {table}{where} ORDER BY updated_at, id LIMIT {EMBEDDING_BATCH_SIZE} OFFSET {offset}"
+            ))
+            if not rows:
+                break
+            _upsert_rows(index, kind, rows)
+            index.watermarks[kind] = rows[-1]["updated_at"]
+            offset += len(rows)
+
+        # Itens gravados pelas ferramentas podem ter um updated_at anterior à marca d'água
+        ids = [row["id"] for row in json.loads(backend.execute(f"SELECT id FROM {table}"))]
+        missing = [id_ for id_ in ids if f"{kind}:{id_}" not in index._positions]
+        for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+            values = ", ".join("'" + str(id_).replace("'", "''") + "'" for id_ in missing[start:start + EMBEDDING_BATCH_SIZE])
+            _upsert_rows(index, kind, json.loads(backend.execute(f"SELECT {COLUMNS} FROM {table} WHERE id IN ({values})")))
+    index.save()
+
+
+def index_issue(issue_id: str, owner: str, repo: str, issue: dict):
+    """Add an issue fetched from the GitHub API to the index of this process, without waiting for update_index."""
+    row = {
+        "id": issue_id,
+        "number": issue.get("number"),
+        "title": issue.get("title"),
+        "body": issue.get("body"),
+        "url": issue.get("html_url"),
+        "repository_owner": owner,
+        "repository_name": repo,
+    }
+    _upsert_rows(get_index(), "issue", [row])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Return the vector index stored in VECTOR_INDEX_DIR, reloaded when another process saves a newer one."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VectorIndex(VECTOR_INDEX_DIR, get_embedder())
+    _index.reload_if_changed()
+    return _index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cria ou atualiza o índice vetorial de issues e pull requests.")
+    parser.add_argument("--rebuild", action="store_true", help="Descarta o índice atual e indexa tudo novamente")
+    args = parser.parse_args()
+    index = VectorIndex(VECTOR_INDEX_DIR, get_embedder(), load=not args.rebuild)
+    update_index(index)
+    print(f"{len(index.items)} itens indexados")
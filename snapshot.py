@@ -0,0 +1,47 @@
+import argparse
+import os
+import sqlite3
+from pathlib import Path
+import pandas as pd
+import psycopg2
+from database import SNAPSHOT_DIR, TABLES
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def export_snapshots(source_url: str, output_dir: str, sqlite_path: str = None):
+    """Export every table of the PostgreSQL schema to Parquet and optionally load them into a SQLite file."""
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    with psycopg2.connect(source_url, options='-c default_transaction_read_only=on') as conn:
+        for table in TABLES:
+            try:
+                df = pd.read_sql(f"SELECT * FROM public.{table}", conn)
+            except Exception as e:
+                conn.rollback()
+                print(f"Ignorando {table}: {e}")
+                continue
+            # Arrays e JSON são gravados como texto no Parquet
+            for column in df.select_dtypes(include="object").columns:
+                if df[column].map(lambda value: isinstance(value, (list, dict))).any():
+                    df[column] = df[column].astype(str)
+            df.to_parquet(output / f"{table}.parquet", index=False)
+            print(f"{table}: {len(df)} linhas")
+
+    if sqlite_path:
+        with sqlite3.connect(sqlite_path) as sqlite_conn:
+            for table in TABLES:
+                path = output / f"{table}.parquet"
+                if path.exists():
+                    pd.read_parquet(path).to_sql(table, sqlite_conn, if_exists="replace", index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta o schema PostgreSQL para snapshots Parquet.")
+    parser.add_argument("--source", default=os.getenv('SNAPSHOT_SOURCE_URL'), help="URL do PostgreSQL de origem")
+    parser.add_argument("--output", default=SNAPSHOT_DIR, help="Diretório dos arquivos Parquet")
+    parser.add_argument("--sqlite", default=None, help="Arquivo SQLite a ser gerado a partir dos snapshots")
+    args = parser.parse_args()
+    export_snapshots(args.source, args.output, args.sqlite)
@@ -0,0 +1,93 @@
+import threading
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+import budget as budget_module
+from budget import BudgetMiddleware, QuestionBudget
+
+
+class FakeToolModel(FakeMessagesListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _tool_call(call_id, question):
+    return AIMessage(content="", tool_calls=[{"name": "lookup", "args": {"question": question}, "id": call_id}])
+
+
+def _agent(responses, calls):
+    @tool
+    def lookup(question: str):
+        """Look up the answer to a question."""
+        calls.append(question)
+        return f"answer to {question}"
+
+    return create_agent(
+        FakeToolModel(responses=responses),
+        tools=[lookup],
+        middleware=[BudgetMiddleware()],
+        context_schema=QuestionBudget,
+    )
+
+
+def test_repeated_tool_call_is_served_from_cache():
+    calls = []
+    agent = _agent([_tool_call("1", "a"), _tool_call("2", "a"), AIMessage(content="done")], calls)
+    budget = QuestionBudget()
+    result = agent.invoke({"messages": [{"role": "user", "content": "a?"}]}, context=budget)
+
+    assert calls == ["a"]
+    assert result["messages"][-2].content == "answer to a"
+    assert budget.usage()["tool_calls"]["used"] == 1
+    assert budget.usage()["cached_tool_calls"] == 1
+    assert budget.usage()["llm_turns"]["used"] == 3
+
+
+def test_tool_call_limit_stops_executing_tools(monkeypatch):
+    monkeypatch.setattr(budget_module, "BUDGET_MAX_TOOL_CALLS", 1)
+    calls = []
+    agent = _agent([_tool_call("1", "a"), _tool_call("2", "b"), AIMessage(content="done")], calls)
+    budget = QuestionBudget()
+    agent.invoke({"messages": [{"role": "user", "content": "a?"}]}, context=budget)
+
+    assert calls == ["a"]
+    assert budget.usage()["exceeded"] == "tool_calls"
+
+
+def test_concurrent_questions_do_not_share_budgets():
+    barrier = threading.Barrier(2)
+    calls = []
+
+    @tool
+    def lookup(question: str):
+        """Look up the answer to a question."""
+        barrier.wait(timeout=5)
+        calls.append(question)
+        return f"answer to {question}"
+
+    middleware = BudgetMiddleware()
+    budgets, results = {}, {}
+
+    def run(name):
+        # A mesma chamada de ferramenta nas duas perguntas precisa executar nas duas
+        agent = create_agent(
+            FakeToolModel(responses=[_tool_call(name, "same"), AIMessage(content=f"done {name}")]),
+            tools=[lookup],
+            middleware=[middleware],
+            context_schema=QuestionBudget,
+        )
+        budgets[name] = QuestionBudget()
+        results[name] = agent.invoke({"messages": [{"role": "user", "content": name}]}, context=budgets[name])
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in ("x", "y")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["same", "same"]
+    for name in ("x", "y"):
+        assert budgets[name].usage()["tool_calls"]["used"] == 1
+        assert budgets[name].usage()["cached_tool_calls"] == 0
+        assert results[name]["messages"][-1].content == f"done {name}"
@@ -0,0 +1,88 @@
+import threading
+from langgraph.checkpoint.base import empty_checkpoint
+import checkpointer
+from checkpointer import CompressedSerializer, get_checkpointer, prune_checkpoints
+
+
+def _put(saver, thread_id, step):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": [f"step {step}"]}
+    saved = saver.put(config, checkpoint, {"step": step}, {})
+    saver.put_writes(saved, [("messages", f"write {step}")], task_id=f"task-{step}")
+    return saved
+
+
+def _counts(saver, thread_id):
+    checkpoints = saver.conn.execute("SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+    orphan_writes = saver.conn.execute(
+        """
+        SELECT COUNT(*) FROM writes w WHERE w.thread_id = ? AND NOT EXISTS (
+            SELECT 1 FROM checkpoints c
+            WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns AND c.checkpoint_id = w.checkpoint_id
+        )
+        """,
+        (thread_id,),
+    ).fetchone()[0]
+    return checkpoints, orphan_writes
+
+
+def test_serializer_round_trip_below_threshold():
+    serde = CompressedSerializer()
+    value = {"messages": ["curta"]}
+    type_, data = serde.dumps_typed(value)
+    assert not type_.endswith("+zlib")
+    assert len(data) < checkpointer.CHECKPOINTER_COMPRESS_MIN_BYTES
+    assert serde.loads_typed((type_, data)) == value
+
+
+def test_serializer_round_trip_above_threshold():
+    serde = CompressedSerializer()
+    value = {"messages": ["x" * (checkpointer.CHECKPOINTER_COMPRESS_MIN_BYTES * 4)]}
+    type_, data = serde.dumps_typed(value)
+    assert type_.endswith("+zlib")
+    assert len(data) < checkpointer.CHECKPOINTER_COMPRESS_MIN_BYTES
+    assert serde.loads_typed((type_, data)) == value
+
+
+def test_concurrent_writers_same_thread(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    get_checkpointer("sqlite", path)
+    workers, steps = 4, 25
+    errors = []
+
+    def worker(worker_id):
+        # Cada worker tem a sua própria conexão, como processos diferentes da API
+        saver = get_checkpointer("sqlite", path)
+        try:
+            for step in range(steps):
+                _put(saver, "conversa", worker_id * steps + step)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    saver = get_checkpointer("sqlite", path)
+    assert _counts(saver, "conversa") == (workers * steps, 0)
+    latest = saver.get_tuple({"configurable": {"thread_id": "conversa", "checkpoint_ns": ""}})
+    assert latest.checkpoint["channel_values"]["messages"][0].startswith("step ")
+
+
+def test_prune_keeps_latest_checkpoints_without_orphan_writes(tmp_path):
+    saver = get_checkpointer("sqlite", str(tmp_path / "checkpoints.sqlite"))
+    saved = [_put(saver, "conversa", step) for step in range(12)]
+    for step in range(3):
+        _put(saver, "outra", step)
+
+    prune_checkpoints(saver, "conversa", keep=5)
+
+    assert _counts(saver, "conversa") == (5, 0)
+    assert _counts(saver, "outra") == (3, 0)
+    remaining = {c.config["configurable"]["checkpoint_id"] for c in saver.list({"configurable": {"thread_id": "conversa"}})}
+    assert remaining == {s["configurable"]["checkpoint_id"] for s in saved[-5:]}
+    assert saver.conn.execute("SELECT COUNT(*) FROM writes WHERE thread_id = 'conversa'").fetchone()[0] == 5
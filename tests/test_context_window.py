@@ -0,0 +1,90 @@
+import context_window
+from context_window import ContextWindowMiddleware, bucket_num_ctx
+
+
+def test_bucket_rounds_up_to_power_of_two_and_caps_at_max(monkeypatch):
+    monkeypatch.setattr(context_window, "CONTEXT_MIN_NUM_CTX", 8192)
+    monkeypatch.setattr(context_window, "OLLAMA_NUM_CTX", 128000)
+    assert bucket_num_ctx(100) == 8192
+    assert bucket_num_ctx(8193) == 16384
+    assert bucket_num_ctx(70000) == 128000
+    assert bucket_num_ctx(500000) == 128000
+
+
+def test_never_shrinks_within_a_conversation():
+    middleware = ContextWindowMiddleware()
+    assert middleware.choose_num_ctx(8192) == 8192
+    assert middleware.choose_num_ctx(32768) == 32768
+    # A mesma conversa já usou 32k, então não volta para 8k
+    for _ in range(10):
+        assert middleware.choose_num_ctx(8192, thread_num_ctx=32768) == 32768
+
+
+def test_shrinks_only_after_consecutive_smaller_calls(monkeypatch):
+    monkeypatch.setattr(context_window, "CONTEXT_SHRINK_AFTER", 3)
+    middleware = ContextWindowMiddleware()
+    middleware.choose_num_ctx(32768)
+
+    assert middleware.choose_num_ctx(8192) == 32768
+    assert middleware.choose_num_ctx(8192) == 32768
+    # Uma chamada maior zera a contagem
+    assert middleware.choose_num_ctx(32768) == 32768
+    assert middleware.choose_num_ctx(8192) == 32768
+    assert middleware.choose_num_ctx(16384) == 32768
+    assert middleware.choose_num_ctx(8192) == 8192
+    assert middleware.last_num_ctx == 8192
+
+
+def test_grows_immediately():
+    middleware = ContextWindowMiddleware()
+    middleware.choose_num_ctx(8192)
+    assert middleware.choose_num_ctx(65536) == 65536
+
+
+def test_estimate_is_conservative_when_ollama_reports_only_the_uncached_prompt():
+    from types import SimpleNamespace
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+    tool_output = '[{"id": "1", "title": "x"}]' * 1000
+    answer = AIMessage(content="ok", response_metadata={"prompt_eval_count": 50, "eval_count": 10})
+    request = SimpleNamespace(
+        system_prompt="s" * 3000,
+        tools=[],
+        messages=[HumanMessage(content="pergunta"), ToolMessage(content=tool_output, tool_call_id="1"), answer, HumanMessage(content="e agora?")],
+    )
+
+    total_chars = 3000 + len("pergunta") + len(tool_output) + len("ok") + len("e agora?")
+    assert ContextWindowMiddleware().estimate_prompt_tokens(request) >= total_chars // context_window.CHARS_PER_TOKEN
+
+
+def test_chosen_num_ctx_is_recorded_and_kept_by_the_thread(monkeypatch):
+    from langchain.agents import create_agent
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    class FakeOllama(GenericFakeChatModel):
+        # model_copy cria um modelo novo a cada chamada, então cada resposta é uma mensagem nova
+        num_ctx: int = 0
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+    monkeypatch.setattr(context_window, "CONTEXT_GENERATION_MARGIN", 0)
+    monkeypatch.setattr(context_window, "CONTEXT_SHRINK_AFTER", 1)
+    agent = create_agent(
+        FakeOllama(messages=iter([])),
+        middleware=[ContextWindowMiddleware()],
+        checkpointer=InMemorySaver(),
+    )
+    config = {"configurable": {"thread_id": "t"}}
+
+    first = agent.invoke({"messages": [{"role": "user", "content": "x" * 40000}]}, config)
+    assert first["messages"][-1].response_metadata["num_ctx"] == 16384
+
+    # Outra conversa pequena pode reduzir, mas a mesma conversa mantém o contexto que já usou
+    other = agent.invoke({"messages": [{"role": "user", "content": "oi"}]}, {"configurable": {"thread_id": "u"}})
+    assert other["messages"][-1].response_metadata["num_ctx"] == 8192
+    same = agent.invoke({"messages": [{"role": "user", "content": "oi"}]}, config)
+    assert same["messages"][-1].response_metadata["num_ctx"] == 16384
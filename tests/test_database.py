@@ -0,0 +1,88 @@
+import json
+import sqlite3
+import pytest
+from database import DuckDBBackend, SQLiteBackend
+
+
+def _rows(backend, query):
+    return json.loads(backend.execute(query))
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    path = tmp_path / "issues.sqlite"
+    with sqlite3.connect(path) as conn:
+        # Mesmo formato gravado pelo pandas.to_sql no snapshot.py
+        conn.execute('CREATE TABLE issues (id TEXT, "number" INTEGER, state TEXT, created_at TIMESTAMP, closed_at TIMESTAMP)')
+        conn.execute("INSERT INTO issues VALUES ('1', 1, 'closed', '2024-01-10 12:00:00+00:00', '2024-01-12 12:00:00+00:00')")
+        conn.execute("INSERT INTO issues VALUES ('2', 2, 'open', DATETIME('now', '-1 day'), NULL)")
+    return SQLiteBackend(str(path))
+
+
+def test_sqlite_translates_intervals(sqlite_backend):
+    assert _rows(sqlite_backend, "SELECT COUNT(*) AS n FROM public.issues WHERE created_at > NOW() - INTERVAL '30 days'") == [{"n": 1}]
+    assert _rows(sqlite_backend, "SELECT created_at + INTERVAL '1 day 2 hours' AS t FROM issues WHERE id = '1'") == [
+        {"t": "2024-01-11 14:00:00"}
+    ]
+
+
+def test_sqlite_translates_extract_and_date_trunc(sqlite_backend):
+    assert _rows(
+        sqlite_backend,
+        "SELECT EXTRACT(YEAR FROM created_at) AS y, EXTRACT(EPOCH FROM closed_at - created_at) AS s, "
+        "date_trunc('month', created_at) AS m, date_trunc('week', created_at) AS w "
+        "FROM issues WHERE id = '1'",
+    ) == [{"y": 2024, "s": 172800.0, "m": "2024-01-01 00:00:00", "w": "2024-01-08 00:00:00"}]
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT AVG(closed_at - created_at) FROM issues",
+    "SELECT INTERVAL '1 day'",
+    "SELECT created_at + INTERVAL '1 fortnight' FROM issues",
+    "SELECT EXTRACT(QUARTER FROM created_at) FROM issues",
+    "SELECT date_trunc('quarter', created_at) FROM issues",
+    "SELECT CAST(created_at AS INTERVAL) FROM issues",
+])
+def test_sqlite_refuses_syntax_without_exact_translation(sqlite_backend, query):
+    with pytest.raises(ValueError):
+        sqlite_backend.translate(query)
+
+
+@pytest.fixture
+def duckdb_backend(tmp_path):
+    import duckdb
+
+    with duckdb.connect() as conn:
+        conn.execute(
+            f"""
+            COPY (
+                SELECT '1' AS id, 1 AS "number", 'closed' AS state,
+                       TIMESTAMP '2024-01-10 12:00:00' AS created_at, TIMESTAMP '2024-01-12 12:00:00' AS closed_at
+            ) TO '{(tmp_path / "issues.parquet").as_posix()}' (FORMAT parquet)
+            """
+        )
+    return DuckDBBackend(str(tmp_path))
+
+
+def test_duckdb_runs_postgres_date_syntax(duckdb_backend):
+    assert _rows(
+        duckdb_backend,
+        "SELECT EXTRACT(EPOCH FROM closed_at - created_at) AS s, "
+        "date_trunc('month', created_at) AS m, created_at + INTERVAL '1 day' AS t, "
+        "state::issue_state AS state "
+        "FROM public.issues WHERE created_at < NOW() - INTERVAL '30 days'",
+    ) == [{"s": 172800.0, "m": "2024-01-01 00:00:00", "t": "2024-01-11 12:00:00", "state": "closed"}]
+    assert _rows(duckdb_backend, "SELECT COUNT(*) AS n FROM issues") == [{"n": 1}]
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT * FROM read_csv('/etc/passwd')",
+    "COPY issues TO '/tmp/issues.csv'",
+    "INSTALL httpfs",
+    "ATTACH '/tmp/other.duckdb'",
+    "DROP TABLE issues",
+    "SELECT 1; SELECT 2",
+])
+def test_duckdb_is_locked_down(duckdb_backend, query):
+    with pytest.raises(Exception):
+        duckdb_backend.execute(query)
@@ -0,0 +1,111 @@
+from datetime import datetime, timezone
+import pytest
+import local_store
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((" ".join(sql.split()), params))
+
+    def fetchone(self):
+        return self.conn.rows.pop(0) if self.conn.rows else None
+
+
+class FakeConnection:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    conn = FakeConnection()
+    indexed = []
+    monkeypatch.setattr(local_store, "DATABASE_TYPE", "postgres")
+    monkeypatch.setattr(local_store, "_schema_ready", True)
+    monkeypatch.setattr(local_store, "_connect", lambda: conn)
+    monkeypatch.setattr(local_store, "index_issue", lambda issue_id, owner, repo, issue: indexed.append(issue_id))
+    conn.indexed = indexed
+    return conn
+
+
+ISSUE = {
+    "id": 5575402,
+    "node_id": "MDU6SXNzdWU1NTc1NDAy",
+    "number": 42,
+    "title": "Found a bug",
+    "body": "It crashes",
+    "user": {"login": "octocat"},
+    "state": "closed",
+    "state_reason": "duplicate",
+    "html_url": "https://github.com/octocat/Hello-World/issues/42",
+    "labels": [{"name": "bug", "color": "d73a4a"}],
+    "comments": 3,
+}
+
+
+def test_upsert_issue_updates_the_existing_row_of_the_same_number(db):
+    db.rows = [("123",)]
+
+    local_store.upsert_issue("octocat", "Hello-World", ISSUE)
+
+    statements = [sql for sql, _ in db.executed]
+    assert not any(sql.startswith("INSERT INTO public.issues") for sql in statements)
+    update = next(params for sql, params in db.executed if sql.startswith("UPDATE public.issues"))
+    assert update[-1] == "123"
+    # duplicate não existe no enum issue_state_reason
+    assert update[-2] is None
+    assert ("INSERT INTO public.issue_labels (issue_id, label_name) VALUES (%s, %s) ON CONFLICT DO NOTHING", ("123", "bug")) in db.executed
+    assert db.indexed == ["123"]
+
+
+def test_upsert_issue_inserts_new_issues_with_the_rest_id(db):
+    local_store.upsert_issue("octocat", "Hello-World", {**ISSUE, "state_reason": "completed"})
+
+    insert = next(params for sql, params in db.executed if sql.startswith("INSERT INTO public.issues"))
+    assert insert[0] == "5575402"
+    assert "completed" in insert
+    assert db.indexed == ["5575402"]
+
+
+def test_upsert_issue_skips_pull_requests_and_embedded_backends(db, monkeypatch):
+    local_store.upsert_issue("octocat", "Hello-World", {**ISSUE, "pull_request": {"url": "https://api.github.com/repos/octocat/Hello-World/pulls/42"}})
+    monkeypatch.setattr(local_store, "DATABASE_TYPE", "duckdb")
+    local_store.upsert_issue("octocat", "Hello-World", ISSUE)
+
+    assert db.executed == []
+
+
+def test_get_issue_serves_loaded_rows_without_sync_record(db):
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    db.rows = [("123", 42, "Found a bug", "It crashes", "octocat", "closed", ISSUE["html_url"],
+                created, created, created, 3, "octocat", ["bug"])]
+
+    issue = local_store.get_issue("octocat", "Hello-World", 42)
+
+    sql, params = db.executed[0]
+    assert "LEFT JOIN public.issue_syncs" in sql
+    assert params == ("octocat", "Hello-World", 42, local_store.LOCAL_STORE_TTL_HOURS, local_store.LOCAL_STORE_SETTLED_DAYS)
+    assert issue["id"] == "123"
+    assert issue["labels"] == ["bug"]
+    assert issue["closed_at"] == "2024-01-01T00:00:00+00:00"
+    assert "assignees" not in issue
@@ -0,0 +1,57 @@
+from query_memory import _replace_number, is_reusable, template_sql
+
+
+def _record(question, sql):
+    return {"question": question, "sql": sql, "columns": ["count"], "row_count": 1}
+
+
+REPO_SQL = "SELECT COUNT(*) FROM issues WHERE repository_owner = 'foo' AND repository_name = 'bar'"
+
+
+def test_template_sql_swaps_owner_and_repo_in_one_pass():
+    record = _record("quantas issues tem foo/bar", REPO_SQL)
+
+    assert template_sql("quantas issues tem bar/baz", 1.0, record) == (
+        "SELECT COUNT(*) FROM issues WHERE repository_owner = 'bar' AND repository_name = 'baz'"
+    )
+
+
+def test_template_sql_refuses_ambiguous_literals():
+    record = _record(
+        "quantas issues tem foo/foo",
+        "SELECT COUNT(*) FROM issues WHERE repository_owner = 'foo' AND repository_name = 'foo'",
+    )
+
+    assert template_sql("quantas issues tem a/b", 1.0, record) is None
+
+
+def test_template_sql_refuses_literals_missing_from_the_sql():
+    record = _record("quantas issues tem foo/bar", "SELECT COUNT(*) FROM issues WHERE repository_owner = 'foo'")
+
+    assert template_sql("quantas issues tem a/b", 1.0, record) is None
+
+
+def test_template_sql_replaces_numbers_and_quoted_strings():
+    record = _record(
+        "top 5 issues com label 'bug'",
+        "SELECT title FROM issues i JOIN issue_labels l ON l.issue_id = i.id WHERE l.label_name = 'bug' LIMIT 5",
+    )
+
+    assert template_sql("top 10 issues com label 'docs'", 1.0, record) == (
+        "SELECT title FROM issues i JOIN issue_labels l ON l.issue_id = i.id WHERE l.label_name = 'docs' LIMIT 10"
+    )
+    assert template_sql("top 10 issues com label 'docs'", 0.5, record) is None
+
+
+def test_replace_number_only_touches_a_single_standalone_token():
+    assert _replace_number("SELECT * FROM issues LIMIT 5", "5", "10") == "SELECT * FROM issues LIMIT 10"
+    assert _replace_number("SELECT * FROM issues WHERE created_at >= '2024-01-01' AND \"number\" > 2024", "2024", "2023") is None
+    assert _replace_number("SELECT 5 AS a LIMIT 5", "5", "10") is None
+    assert _replace_number("SELECT * FROM t WHERE x > 1.5 LIMIT 15", "5", "10") is None
+
+
+def test_is_reusable_skips_errors_empty_results_and_schema_discovery():
+    assert is_reusable("SELECT COUNT(*) FROM issues", '[{"count": 3}]')
+    assert not is_reusable("SELECT * FROM issues WHERE false", "[]")
+    assert not is_reusable("SELECT * FROM issues", "Error executing SQL query: boom")
+    assert not is_reusable("SELECT table_name FROM information_schema.tables", '[{"table_name": "issues"}]')
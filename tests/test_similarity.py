@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from similarity import HashingEmbedder, VectorIndex
+
+
+def _item(key, kind="issue"):
+    return {"key": key, "kind": kind, "id": key, "number": 1, "title": key, "url": "", "repository": "o/r"}
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(dim=64)
+    vectors = embedder.embed(["crash when opening the editor", "crash when opening the editor", ""])
+
+    assert vectors.shape == (3, 64)
+    assert vectors.dtype == np.float32
+    assert np.array_equal(vectors[0], vectors[1])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    # Texto sem palavras não gera NaN
+    assert not vectors[2].any()
+
+
+def test_hashing_embedder_ranks_related_texts_higher():
+    query, related, unrelated = HashingEmbedder().embed([
+        "app crashes when opening a large file",
+        "crash opening large file in the app",
+        "add dark mode to the settings page",
+    ])
+
+    assert query @ related > query @ unrelated
+
+
+def test_upsert_replaces_existing_items_and_search_filters_by_kind():
+    index = VectorIndex("unused", HashingEmbedder(dim=128), load=False)
+    index.upsert([_item("a"), _item("b", "pull_request")], ["login page is broken", "fix login page"])
+    index.upsert([_item("a")], ["dark mode for settings"])
+
+    assert len(index.items) == index.matrix.shape[0] == 2
+    assert index.search("dark mode settings", k=1)[0]["key"] == "a"
+    assert [item["key"] for item in index.search("login page", k=5, kind="pull_request")] == ["b"]
+    assert len(index.search("login page", k=0)) == 1
+
+
+def test_search_refuses_an_empty_index_and_unknown_kinds():
+    index = VectorIndex("unused", HashingEmbedder(dim=128), load=False)
+    with pytest.raises(ValueError, match="empty"):
+        index.search("anything")
+
+    index.upsert([_item("a")], ["login page is broken"])
+    with pytest.raises(ValueError, match="Unknown kind"):
+        index.search("login page", kind="discussion")
+
+
+def test_saved_index_is_reloaded_and_refuses_another_embedder(tmp_path):
+    writer = VectorIndex(tmp_path, HashingEmbedder(dim=128))
+    writer.upsert([_item("a")], ["login page is broken"])
+    writer.save()
+
+    reader = VectorIndex(tmp_path, HashingEmbedder(dim=128))
+    assert [item["key"] for item in reader.items] == ["a"]
+
+    writer.upsert([_item("b")], ["dark mode for settings"])
+    writer.save()
+    reader.reload_if_changed()
+    assert [item["key"] for item in reader.search("dark mode", k=1)] == ["b"]
+
+    with pytest.raises(ValueError):
+        VectorIndex(tmp_path, HashingEmbedder(dim=64))
@@ -1,12 +1,14 @@
 import json
 import os
-import psycopg2
 import requests
 from langchain_core.tools import tool
 from ddgs import DDGS
 import requests
 from bs4 import BeautifulSoup
 from logger import logger
+from database import get_backend
+from similarity import get_index
+from local_store import get_issue, upsert_issue, get_user, upsert_user
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -269,19 +271,42 @@ def sql_query_executor(query: str):
     CREATE INDEX IF NOT EXISTS idx_commits_repo ON public.commits(repository_owner, repository_name);
     CREATE INDEX IF NOT EXISTS idx_commits_pull_request_id ON public.commits(pull_request_id);
     CREATE INDEX IF NOT EXISTS idx_commits_author_name ON public.commits(author_name);
+
+    -- Table: public.users
+    -- Store GitHub users fetched by the get_user_info tool.
+
+    CREATE TABLE IF NOT EXISTS public.users
+    (
+        login        VARCHAR(255) PRIMARY KEY,
+        name         VARCHAR(255),
+        company      VARCHAR(255),
+        blog         TEXT,
+        location     VARCHAR(255),
+        email        VARCHAR(255),
+        type         VARCHAR(50),
+        public_repos INTEGER,
+        url          TEXT,
+        html_url     TEXT,
+        created_at   TIMESTAMPTZ,
+        updated_at   TIMESTAMPTZ,
+        synced_at    TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    );
+
+    -- Table: public.issue_syncs
+    -- Last time each issue was synced from the GitHub API by the get_repository_issue_info tool.
+
+    CREATE TABLE IF NOT EXISTS public.issue_syncs
+    (
+        issue_id  VARCHAR(255) PRIMARY KEY REFERENCES public.issues (id) ON DELETE CASCADE,
+        synced_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    );
     ```
     Args:
         query (str): The SQL query to execute.
     """
     try:
         logger.info(f"Executing SQL query: {query}", extra={"role": "sql_query_executor", "tool_name": "sql_query_executor"})
-        with psycopg2.connect(os.environ['DATABASE_URL'], options='-c default_transaction_read_only=on') as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(query)
-                rows = cursor.fetchall()
-                columns = [desc[0] for desc in cursor.description]
-                results = [dict(zip(columns, row)) for row in rows]
-                return json.dumps(results, indent=2, default=str)
+        return get_backend().execute(query)
     except Exception as e:
         return f"Error executing SQL query: {e}"
 
@@ -330,9 +355,15 @@ def get_user_info(name: str):
     Args:
         name (str): GitHub username.
     """
+    local_data = get_user(name)
+    if local_data is not None:
+        logger.info(f"Local user info for: {name}", extra={"role": "get_user_info", "tool_name": "get_user_info"})
+        return json.dumps(local_data, indent=2)
+
     logger.info(f"Fetching user info for: {name}", extra={"role": "get_user_info", "tool_name": "get_user_info"})
     r = requests.get(f"https://api.github.com/users/{name}")
     if r.status_code == 200:
+        upsert_user(r.json())
         essencial_data = {
             "login": r.json().get("login"),
             "url": r.json().get("url"),
@@ -475,9 +506,15 @@ def get_repository_issue_info(owner: str, repo: str, issue_number: int):
     """
 
     try:
+        local_data = get_issue(owner, repo, issue_number)
+        if local_data is not None:
+            logger.info(f"Local {owner}/{repo} issue: {issue_number}", extra={"role": "get_repository_issue_info", "tool_name": "get_repository_issue_info"})
+            return json.dumps(local_data, indent=2)
+
         logger.info(f"Fetching {owner}/{repo} issue: {issue_number}", extra={"role": "get_repository_issue_info", "tool_name": "get_repository_issue_info"})
         r = requests.get(f"https://api.github.com/repos/{owner}/{repo}/issues/{issue_number}")
         if r.status_code == 200:
+            upsert_issue(owner, repo, r.json())
             essential_data = {
                 "url": r.json().get("url"),
                 "repository_url": r.json().get("repository_url"),
@@ -519,4 +556,24 @@ def visit_url(url: str):
 
         return text[:2000]
     except Exception as e:
-        return f"Error fetching URL {url}: {e}"
\ No newline at end of file
+        return f"Error fetching URL {url}: {e}"
+
+@tool
+def find_similar_items(text: str, k: int = 5, kind: str = "all"):
+    """Find the issues and pull requests in the database that are most similar to a text, such as the title or body of an issue. Use it to look for duplicated or related reports.
+
+    Args:
+        text (str): The text to compare against, e.g. an issue title and description.
+        k (int): How many similar items to return. Default is 5.
+        kind (str): 'issue', 'pull_request' or 'all'. Default is 'all'.
+
+    Returns an error message when the index has not been built or kind is invalid; an empty list means nothing similar was found.
+    """
+    try:
+        logger.info(f"Finding items similar to: {text}", extra={"role": "find_similar_items", "tool_name": "find_similar_items"})
+        results = get_index().search(text, k=k, kind=None if kind == "all" else kind)
+        if not results:
+            return f"No {'issues or pull requests' if kind == 'all' else kind + 's'} similar to the text were found"
+        return json.dumps(results, indent=2)
+    except Exception as e:
+        return f"Error finding similar items: {e}"
\ No newline at end of file